@@ -1,17 +1,112 @@
 import aiohttp
 import json
+import os
 import re
 import time
 import datetime
 import asyncio
+import functools
+from collections import OrderedDict
+from itertools import islice
+from html import unescape
 from astrbot.api.event import filter, AstrMessageEvent
 from astrbot.api.star import Context, Star, register, StarTools
 from astrbot.api import AstrBotConfig, logger
 from pathlib import Path
 
+try:
+    # orjson 直接解析/生成bytes，速度更快；未安装时回退到标准库
+    import orjson
+    _json_loads = orjson.loads
+
+    def _json_dumps(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+except ImportError:
+    _json_loads = json.loads
+
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, indent=4).encode('utf-8')
+
+# 所有API请求共用的默认请求头
+_DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+    "Accept": "application/json"
+}
+
+# 邮件内容清理使用的正则，模块加载时预编译
+# HTML标签与HTML实体合并为一个正则，实体部分与 html.unescape 的匹配规则一致
+_MARKUP_RE = re.compile(r'<[^>]+>|&(?:#[0-9]+;?|#[xX][0-9a-fA-F]+;?|[^\t\n\f <&#;]{1,32};?)')
+_WS_RE = re.compile(r'\s+')
+
+# 每类用户数据最多保留的用户数，超出时淘汰最久未使用的用户
+_MAX_CACHED_USERS = 1024
+
+# 预取的邮件详情有效期（秒）
+_DETAIL_PREFETCH_TTL = 60
+
+# 用户数据修改后延迟写盘的时间（秒），期间的多次修改合并为一次写入
+_SAVE_DELAY = 2.0
+
+# 邮件详情中主题、发件人最多显示的字符数
+_MAX_HEADER_FIELD = 200
+
+# 邮件原文最多处理的字符数，回复长度有限，更靠后的内容不会被展示
+_MAX_RAW_CONTENT = 64 * 1024
+
+
+def _parse_json_object(raw: bytes) -> dict:
+    """解析API响应体，响应不是JSON对象时抛出ValueError"""
+    data = _json_loads(raw)
+    if not isinstance(data, dict):
+        raise ValueError(f"API响应不是JSON对象: {type(data).__name__}")
+    return data
+
+
+def _replace_markup(match: re.Match) -> str:
+    """HTML标签替换为空，HTML实体解码为对应字符"""
+    text = match.group()
+    return unescape(text) if text[0] == '&' else ''
+
+
+def _lru_trim(cache: OrderedDict):
+    """淘汰超出上限的最久未使用条目"""
+    while len(cache) > _MAX_CACHED_USERS:
+        cache.popitem(last=False)
+
+
+def _lru_put(cache: OrderedDict, key, value):
+    """写入用户数据并标记为最近使用"""
+    cache[key] = value
+    cache.move_to_end(key)
+    _lru_trim(cache)
+
+
+def _lru_get(cache: OrderedDict, key):
+    """读取用户数据并标记为最近使用"""
+    value = cache.get(key)
+    if value is not None:
+        cache.move_to_end(key)
+    return value
+
+
+# 邮件时间的显示格式
+_TIME_FMT = "%Y-%m-%d %H:%M:%S"
+
+
+@functools.lru_cache(maxsize=1024)
+def _format_ts(ts: int) -> str:
+    """将秒级时间戳格式化为本地时间，同一秒的结果会被缓存"""
+    return datetime.datetime.fromtimestamp(ts).strftime(_TIME_FMT)
+
 
 @register("temp-email", "victical", "临时邮箱生成插件", "1.0.0", "https://github.com/victical/astrbot_plugin_temp-email")
 class TempEmailPlugin(Star):
+    # 默认的API地址和邮箱类型
+    GENERATE_URL = "https://apiok.us/api/cbea/generate/v1"
+    MESSAGES_URL = "https://apiok.us/api/cbea/messages/v1"
+    MESSAGE_DETAIL_URL = "https://apiok.us/api/cbea/message/detail/v1"
+    EMAIL_TYPE = "*"
+
     def __init__(self, context: Context, config: AstrBotConfig):
         super().__init__(context)
         self.config = config
@@ -23,108 +118,241 @@ class TempEmailPlugin(Star):
         if not self.is_configured:
             logger.warning("临时邮箱插件：api_key 未在配置中设置，插件功能将被禁用。请在插件配置中设置API密钥后重载插件。")
         
-        # 直接在代码中设置默认的API地址和邮箱类型
-        self.generate_url = "https://apiok.us/api/cbea/generate/v1"
-        self.messages_url = "https://apiok.us/api/cbea/messages/v1"
-        self.message_detail_url = "https://apiok.us/api/cbea/message/detail/v1"
-        self.email_type = "*"
-        
         # 初始化数据持久化
         self.data_dir = StarTools.get_data_dir()
         self.user_data_file = self.data_dir / "user_data.json"
         self._load_user_data()
+        self._dirty = False
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._flush_task: asyncio.Task | None = None
+        self._save_lock = asyncio.Lock()
+        self._data_dir_ready = False
+        
+        # 复用的HTTP会话，首次请求时创建
+        self._session: aiohttp.ClientSession | None = None
+
+        # API响应中实际使用的字段名，首次识别后缓存
+        self._field_keys: dict[str, str] = {}
+
+        # 预取的最新邮件详情：user_origin -> (邮件ID, 预取任务, 创建时间)
+        self.user_detail_cache = OrderedDict()
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """获取共享的HTTP会话，复用连接池避免每次请求重新握手"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=20,
+                limit_per_host=10,
+                # 命令间隔通常较长，适当延长空闲连接保活时间以便复用
+                keepalive_timeout=60,
+                ttl_dns_cache=300,
+                enable_cleanup_closed=True
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                # 建立TCP连接单独限时，服务不可达时尽快失败；
+                # 不限制 connect，它包含等待连接池空闲连接的时间
+                timeout=aiohttp.ClientTimeout(total=65, sock_connect=5, sock_read=60),
+                headers=_DEFAULT_HEADERS
+            )
+        return self._session
+
+    async def _prefetch_detail(self, message_id: str):
+        """后台预取邮件详情并渲染为回复文本，失败时返回None，由查看正文重新请求"""
+        try:
+            session = await self._get_session()
+            params = {
+                "apikey": self.api_key,
+                "id": message_id
+            }
+            async with session.get(self.MESSAGE_DETAIL_URL, params=params) as response:
+                if response.status != 200:
+                    return None
+                data = _parse_json_object(await response.read())
+                result = data.get("result")
+                if not isinstance(result, dict) or not result:
+                    return None
+                # 只缓存渲染后的回复文本，不保留完整的邮件原文
+                return self._format_message_detail(message_id, result)
+        except Exception as e:
+            # 预取只是优化，任何失败都视为未命中
+            logger.debug(f"临时邮箱插件：预取邮件详情失败: {e}")
+            return None
+
+    def _schedule_detail_prefetch(self, user_origin: str, message_id: str):
+        """在用户阅读邮件列表时预取最新邮件的详情"""
+        previous = self.user_detail_cache.get(user_origin)
+        if previous is not None:
+            if previous[0] == message_id and time.monotonic() - previous[2] <= _DETAIL_PREFETCH_TTL:
+                return
+            previous[1].cancel()
         
-        # 并发安全：为每个用户创建锁
-        self.user_locks = {}
-        self.global_lock = asyncio.Lock()
+        task = asyncio.create_task(self._prefetch_detail(message_id))
+        _lru_put(self.user_detail_cache, user_origin, (message_id, task, time.monotonic()))
 
-    def _clean_email_content(self, content: str) -> str:
-        """清理邮件内容，移除不必要的格式代码"""
+    async def _get_prefetched_detail(self, user_origin: str, message_id: str):
+        """取出预取的邮件详情回复文本，未命中、已过期或预取失败时返回None"""
+        entry = self.user_detail_cache.get(user_origin)
+        if entry is None:
+            return None
+        
+        cached_id, task, created_time = entry
+        if cached_id != message_id:
+            return None
+        
+        # 命中或过期后都移除该条目，避免预取结果长期驻留内存
+        del self.user_detail_cache[user_origin]
+        if time.monotonic() - created_time > _DETAIL_PREFETCH_TTL:
+            task.cancel()
+            return None
+        
+        if not task.done():
+            # 预取仍在进行时直接等待，同样能省去一部分往返时间
+            await asyncio.wait((task,))
+        if task.cancelled() or task.exception() is not None:
+            return None
+        return task.result()
+
+    def _format_message_detail(self, message_id: str, result: dict) -> str:
+        """将邮件详情格式化为回复文本"""
+        sender = str(result.get("from", "未知发件人"))[:_MAX_HEADER_FIELD]
+        subject = str(result.get("subject", "无主题"))[:_MAX_HEADER_FIELD]
+        content = result.get("content")
+        if not isinstance(content, str):
+            # 非字符串内容视为缺失
+            content = ""
+        # 先截断超长原文，避免为最终会被丢弃的内容做清理
+        content = content[:_MAX_RAW_CONTENT]
+        
+        header = "".join((
+            f"📧 邮件详情 (ID: {message_id})\n\n",
+            f"📋 主题: {subject}\n",
+            f"👤 发件人: {sender}\n",
+            "📄 内容:"
+        ))
+        
+        # 按回复剩余长度截断正文
+        cleaned_content = self._clean_email_content(content, max_len=max(1900 - len(header), 0))
+        
+        reply_text = header + cleaned_content
+        # 邮件ID等字段过长时的兜底截断
+        if len(reply_text) > 2000:
+            reply_text = reply_text[:1900] + "\n... (内容过长，已截断)"
+        
+        return reply_text
+
+    def _pick_field(self, item: dict, slot: str, candidates: tuple):
+        """按候选字段名取值，首次命中后记住字段名，之后直接读取该字段"""
+        key = self._field_keys.get(slot)
+        if key is not None:
+            value = item.get(key)
+            if value:
+                return value
+        
+        for candidate in candidates:
+            value = item.get(candidate)
+            if value:
+                if candidate != key:
+                    self._field_keys[slot] = candidate
+                    logger.info(f"临时邮箱插件：API字段 {slot} 识别为 {candidate}")
+                return value
+        return None
+
+    def _clean_email_content(self, content: str, max_len: int = 1800) -> str:
+        """清理邮件内容，移除不必要的格式代码，结果超过 max_len 时截断"""
         if not content:
             return "无内容"
         
         # 直接截断--- mail_boundary ---后的所有内容
-        boundary_index = content.find('--- mail_boundary ---')
-        if boundary_index != -1:
-            content = content[:boundary_index]
-        
-        # 移除HTML标签
-        content = re.sub(r'<[^>]+>', '', content)
+        content = content.partition('--- mail_boundary ---')[0]
         
-        # 解码常见的HTML实体
-        content = content.replace('&nbsp;', ' ')
-        content = content.replace('&amp;', '&')
-        content = content.replace('&lt;', '<')
-        content = content.replace('&gt;', '>')
-        content = content.replace('&quot;', '"')
+        # 纯文本邮件占多数，不含对应字符时跳过正则处理
+        # 一次扫描同时移除HTML标签并解码HTML实体（包括数字实体），&nbsp; 会在下方空白清理时转换为空格
+        if '<' in content or '&' in content:
+            content = _MARKUP_RE.sub(_replace_markup, content)
         
-        # 清理多余的空白字符
-        content = re.sub(r'\s+', ' ', content)
+        # 清理多余的空白字符（只含单个半角空格时无需处理）
+        if '  ' in content or not content.isprintable():
+            content = _WS_RE.sub(' ', content)
         content = content.strip()
         
         # 如果清理后内容为空，返回提示
         if not content or content.isspace():
             return "邮件内容为空"
         
+        if len(content) > max_len:
+            content = content[:max_len] + "\n... (内容过长，已截断)"
+        
         return content
 
-    async def _get_user_lock(self, user_origin: str) -> asyncio.Lock:
-        """获取指定用户的锁，如果不存在则创建"""
-        async with self.global_lock:
-            if user_origin not in self.user_locks:
-                self.user_locks[user_origin] = asyncio.Lock()
-            return self.user_locks[user_origin]
-
     def _load_user_data(self):
         """从文件加载用户数据"""
         if self.user_data_file.exists():
             try:
-                with open(self.user_data_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    self.user_email_ids = data.get("user_email_ids", {})
-                    self.user_message_ids = data.get("user_message_ids", {})
+                data = _json_loads(self.user_data_file.read_bytes())
+                self.user_email_ids = OrderedDict(data.get("user_email_ids", {}))
+                self.user_message_ids = OrderedDict(data.get("user_message_ids", {}))
+                # 文件中可能存有超出上限的旧数据，只保留最近的部分
+                _lru_trim(self.user_email_ids)
+                _lru_trim(self.user_message_ids)
             except (json.JSONDecodeError, IOError) as e:
                 # 如果文件损坏或读取失败，初始化为空字典
                 logger.warning(f"临时邮箱插件：加载用户数据失败，将使用空数据: {e}")
-                self.user_email_ids = {}
-                self.user_message_ids = {}
+                self.user_email_ids = OrderedDict()
+                self.user_message_ids = OrderedDict()
         else:
-            self.user_email_ids = {}
-            self.user_message_ids = {}
+            self.user_email_ids = OrderedDict()
+            self.user_message_ids = OrderedDict()
+
+    async def _save_user_data(self):
+        """保存用户数据到文件，序列化在事件循环中完成，写盘放到线程池执行"""
+        data = {
+            "user_email_ids": self.user_email_ids,
+            "user_message_ids": self.user_message_ids
+        }
+        payload = _json_dumps(data)
+        async with self._save_lock:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._write_user_data, payload)
 
-    def _save_user_data(self):
-        """保存用户数据到文件"""
+    def _write_user_data(self, payload: bytes):
+        """将序列化后的用户数据写入文件"""
         try:
-            self.data_dir.mkdir(parents=True, exist_ok=True)
-            with open(self.user_data_file, 'w', encoding='utf-8') as f:
-                data = {
-                    "user_email_ids": self.user_email_ids,
-                    "user_message_ids": self.user_message_ids
-                }
-                json.dump(data, f, ensure_ascii=False, indent=4)
+            if not self._data_dir_ready:
+                self.data_dir.mkdir(parents=True, exist_ok=True)
+                self._data_dir_ready = True
+            # 先写临时文件再原子替换，避免写入中途崩溃导致数据文件损坏
+            tmp_file = self.user_data_file.with_suffix('.json.tmp')
+            tmp_file.write_bytes(payload)
+            os.replace(tmp_file, self.user_data_file)
         except IOError as e:
             # 记录保存失败，但不影响程序运行
             logger.warning(f"临时邮箱插件：保存用户数据失败: {e}")
 
+    def _schedule_flush(self):
+        """标记用户数据已修改，稍后统一写入文件"""
+        self._dirty = True
+        if self._flush_handle is None:
+            loop = asyncio.get_running_loop()
+            self._flush_handle = loop.call_later(_SAVE_DELAY, self._flush_if_dirty)
+
+    def _flush_if_dirty(self):
+        """将积累的修改写入文件"""
+        self._flush_handle = None
+        if self._dirty:
+            self._dirty = False
+            self._flush_task = asyncio.create_task(self._save_user_data())
+
     def _timestamp_to_local_time(self, timestamp) -> str:
         """将时间戳转换为本地时间格式"""
         try:
-            # 处理不同格式的时间戳
-            if isinstance(timestamp, str):
-                # 如果是字符串，尝试转换为浮点数
-                timestamp = float(timestamp)
-            
+            # 数字和数字字符串统一按浮点数处理
+            ts = float(timestamp)
             # 检查时间戳的位数来判断是秒还是毫秒
-            if timestamp > 1e12:  # 毫秒时间戳
-                timestamp = timestamp / 1000
-            
-            # 转成本地时区的时间元组
-            local_time = time.localtime(timestamp)
-            # 格式化为易读的格式
-            formatted_local = time.strftime("%Y-%m-%d %H:%M:%S", local_time)
-            return formatted_local
-            
-        except (ValueError, TypeError):
+            if ts > 1e12:  # 毫秒时间戳
+                ts *= 0.001
+            return _format_ts(int(ts))
+        except (TypeError, ValueError, OverflowError, OSError):
             # 如果转换失败，返回原始时间戳
             return str(timestamp) if timestamp else "未知时间"
 
@@ -137,68 +365,61 @@ class TempEmailPlugin(Star):
             return
             
         user_origin = event.unified_msg_origin
-        user_lock = await self._get_user_lock(user_origin)
         
-        async with user_lock:
-            try:
-                # 调用临时邮箱API
-                async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=65)) as session:
-                    # 根据API文档，使用query string传递apikey
-                    headers = {
-                        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-                        "Accept": "application/json"
-                    }
+        try:
+            # 调用临时邮箱API
+            session = await self._get_session()
+            # 根据API文档，使用query string传递apikey
+            
+            # 根据示例代码，添加type参数
+            params = {
+                "apikey": self.api_key,
+                "type": self.EMAIL_TYPE
+            }
+            
+            async with session.get(self.GENERATE_URL, params=params) as response:
+                if response.status == 200:
+                    data = _parse_json_object(await response.read())
                     
-                    # 根据示例代码，添加type参数
-                    params = {
-                        "apikey": self.api_key,
-                        "type": self.email_type
-                    }
+                    result = data.get("result", {})
                     
-                    async with session.get(self.generate_url, params=params, headers=headers) as response:
-                        if response.status == 200:
-                            try:
-                                data = await response.json()
-                                
-                                result = data.get("result", {})
-                                
-                                # 获取邮箱地址
-                                email = None
-                                if isinstance(result, dict):
-                                    email = result.get("email") or result.get("mail") or result.get("address")
-                                elif isinstance(result, str):
-                                    email = result
-                                
-                                if email:
-                                    email_id = result.get("id", "") if isinstance(result, dict) else ""
-                                    
-                                    if email_id:
-                                        self.user_email_ids[user_origin] = {
-                                            "email_id": email_id,
-                                            "email_address": email,
-                                            "created_time": time.time()
-                                        }
-                                        self._save_user_data()
-                                    
-                                    reply_text = f"✅ 临时邮箱生成成功！\n\n📧 邮箱地址：{email}"
-                                    if email_id:
-                                        reply_text += f"\n🆔 邮箱ID：{email_id}"
-                                    reply_text += f"\n\n⚠️ 注意：此邮箱为临时邮箱，请及时使用。"
-                                    reply_text += f"\n📬 使用 邮箱列表 快速查看邮件列表"
-                                    yield event.plain_result(reply_text)
-                                else:
-                                    yield event.plain_result("❌ 生成邮箱失败，请稍后重试")
-                                    
-                            except json.JSONDecodeError as e:
-                                logger.error(f"临时邮箱插件：生成邮箱API返回JSON格式无效: {e}")
-                                yield event.plain_result("❌ API返回的JSON格式无效")
-                        else:
-                            logger.error(f"临时邮箱插件：生成邮箱网络请求失败，状态码: {response.status}")
-                            yield event.plain_result("❌ 网络请求失败")
+                    # 获取邮箱地址
+                    email = None
+                    email_id = ""
+                    if isinstance(result, dict):
+                        email = self._pick_field(result, "email", ("email", "mail", "address"))
+                        email_id = result.get("id", "")
+                    
+                    if email:
+                        if email_id:
+                            _lru_put(self.user_email_ids, user_origin, {
+                                "email_id": email_id,
+                                "email_address": email,
+                                "created_time": time.time()
+                            })
+                            self._schedule_flush()
                         
-            except Exception as e:
-                logger.error(f"临时邮箱插件：生成临时邮箱时发生错误: {e}")
-                yield event.plain_result("❌ 生成临时邮箱时发生错误")
+                        reply_parts = [f"✅ 临时邮箱生成成功！\n\n📧 邮箱地址：{email}"]
+                        if email_id:
+                            reply_parts.append(f"\n🆔 邮箱ID：{email_id}")
+                        reply_parts.append("\n\n⚠️ 注意：此邮箱为临时邮箱，请及时使用。")
+                        reply_parts.append("\n📬 使用 邮箱列表 快速查看邮件列表")
+                        yield event.plain_result("".join(reply_parts))
+                    else:
+                        yield event.plain_result("❌ 生成邮箱失败，请稍后重试")
+                else:
+                    logger.error(f"临时邮箱插件：生成邮箱网络请求失败，状态码: {response.status}")
+                    yield event.plain_result("❌ 网络请求失败")
+                
+        except asyncio.TimeoutError:
+            logger.error("临时邮箱插件：生成临时邮箱时请求超时")
+            yield event.plain_result("❌ 请求超时，请稍后重试")
+        except aiohttp.ClientError as e:
+            logger.error(f"临时邮箱插件：生成临时邮箱时发生错误: {e}")
+            yield event.plain_result("❌ 生成临时邮箱时发生错误")
+        except ValueError as e:
+            logger.error(f"临时邮箱插件：生成邮箱API返回JSON格式无效: {e}")
+            yield event.plain_result("❌ API返回的JSON格式无效")
 
     @filter.command("邮箱列表")
     async def get_email_messages(self, event: AstrMessageEvent):
@@ -209,93 +430,99 @@ class TempEmailPlugin(Star):
             return
             
         user_origin = event.unified_msg_origin
-        user_lock = await self._get_user_lock(user_origin)
         
-        async with user_lock:
-            # 从消息中解析邮箱ID参数
-            message_text = event.message_str.strip()
-            parts = message_text.split()
-            
-            email_id = None
-            if len(parts) > 1:
-                # 如果有参数，使用参数作为邮箱ID
-                email_id = parts[1].strip()
-            
-            if not email_id:
-                # 如果没有参数，尝试使用用户存储的邮箱ID
-                if user_origin in self.user_email_ids:
-                    email_id = self.user_email_ids[user_origin]["email_id"]
-                else:
-                    yield event.plain_result("❌ 未找到您的邮箱信息，请先使用 获取邮箱 生成邮箱，或手动指定邮箱ID\n\n使用方法: 邮箱列表 <邮箱ID>")
-                    return
+        # 从消息中解析邮箱ID参数
+        message_text = event.message_str.strip()
+        # 只需要命令后的第一个参数，限制拆分次数
+        parts = message_text.split(None, 2)
+        
+        email_id = None
+        if len(parts) > 1:
+            # 如果有参数，使用参数作为邮箱ID
+            email_id = parts[1].strip()
+        
+        if not email_id:
+            # 如果没有参数，尝试使用用户存储的邮箱ID
+            email_entry = _lru_get(self.user_email_ids, user_origin)
+            if email_entry:
+                email_id = email_entry["email_id"]
+            else:
+                yield event.plain_result("❌ 未找到您的邮箱信息，请先使用 获取邮箱 生成邮箱，或手动指定邮箱ID\n\n使用方法: 邮箱列表 <邮箱ID>")
+                return
+        
+        try:
+            session = await self._get_session()
+            params = {
+                "apikey": self.api_key,
+                "id": email_id
+            }
             
-            try:
-                async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=65)) as session:
-                    headers = {
-                        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-                        "Accept": "application/json"
-                    }
+            async with session.get(self.MESSAGES_URL, params=params) as response:
+                if response.status == 200:
+                    data = _parse_json_object(await response.read())
+                    result = data.get("result", [])
+                    
+                    messages = []
+                    if isinstance(result, dict) and "messages" in result:
+                        messages = result["messages"]
+                    elif isinstance(result, list):
+                        messages = result
                     
-                    params = {
-                        "apikey": self.api_key,
-                        "id": email_id
-                    }
+                    # 确保messages是列表类型，并跳过格式异常的邮件条目
+                    if not isinstance(messages, list):
+                        logger.error(f"临时邮箱插件：邮件列表API返回的messages不是列表: {type(messages).__name__}")
+                        yield event.plain_result("❌ 获取邮件列表失败，API响应格式错误。")
+                        return
+                    messages = [msg for msg in messages if isinstance(msg, dict)]
                     
-                    async with session.get(self.messages_url, params=params, headers=headers) as response:
-                        if response.status == 200:
-                            try:
-                                response_text = await response.text()
-                                
-                                data = json.loads(response_text)
-                                result = data.get("result", [])
-                                
-                                messages = []
-                                if isinstance(result, dict) and "messages" in result:
-                                    messages = result["messages"]
-                                elif isinstance(result, list):
-                                    messages = result
-                                
-                                if messages and len(messages) > 0:
-                                    # 缓存用户的邮件ID列表
-                                    message_ids = [msg.get("id", "") for msg in messages if msg.get("id")]
-                                    self.user_message_ids[user_origin] = message_ids
-                                    self._save_user_data()
-                                    
-                                    reply_text = f"📬 邮件列表 (邮箱ID: {email_id})\n\n"
-                                    display_messages = messages[:10] if len(messages) > 10 else messages
-                                    
-                                    for i, message in enumerate(display_messages, 1):
-                                        sender = message.get("from", "未知发件人")
-                                        subject = message.get("subject", "无主题")
-                                        msg_id = message.get("id", "")
-                                        msg_time = message.get("time", message.get("date", ""))
-                                        # 转换时间戳为本地时间
-                                        local_time = self._timestamp_to_local_time(msg_time)
-                                        reply_text += f"{i}. 📧 标题：{subject}\n"
-                                        reply_text += f"   👤 发件人: {sender}\n"
-                                        reply_text += f"   📅 时间: {local_time}\n"
-                                        reply_text += "\n"
-                                    
-                                    if len(messages) > 10:
-                                        reply_text += f"... 还有 {len(messages) - 10} 封邮件未显示\n\n"
-                                    
-                                    reply_text += "💡 提示: 直接输入 查看正文 即可查看最新邮件内容"
-                                else:
-                                    reply_text = f"📭 暂无邮件\n\n该邮箱(ID: {email_id})\n目前没有收到任何邮件。"
-                                
-                                yield event.plain_result(reply_text)
-                                    
-                            except json.JSONDecodeError as e:
-                                logger.error(f"临时邮箱插件：邮件列表API返回JSON格式无效: {e}")
-                                yield event.plain_result("❌ 获取邮件列表失败，API响应格式错误。")
-                        else:
-                            response_text = await response.text()
-                            logger.error(f"临时邮箱插件：获取邮件列表网络请求失败，状态码: {response.status}")
-                            yield event.plain_result(f"❌ 网络请求失败，状态码: {response.status}")
+                    if messages and len(messages) > 0:
+                        # 缓存用户的邮件ID列表，只保留当前展示的这一页
+                        message_ids = [msg_id for msg in islice(messages, 10) if (msg_id := msg.get("id"))]
+                        _lru_put(self.user_message_ids, user_origin, message_ids)
+                        self._schedule_flush()
+                        if message_ids:
+                            self._schedule_detail_prefetch(user_origin, message_ids[0])
+                        
+                        reply_parts = [f"📬 邮件列表 (邮箱ID: {email_id})\n\n"]
                         
-            except Exception as e:
-                logger.error(f"临时邮箱插件：获取邮件列表时发生错误: {e}")
-                yield event.plain_result(f"❌ 获取邮件列表时发生错误: {e}")
+                        # 循环外绑定方法，避免每封邮件重复查找属性
+                        pick_field = self._pick_field
+                        to_local_time = self._timestamp_to_local_time
+                        for i, message in enumerate(islice(messages, 10), 1):
+                            sender = message.get("from") or "未知发件人"
+                            subject = message.get("subject") or "无主题"
+                            msg_time = pick_field(message, "time", ("time", "date")) or ""
+                            # 转换时间戳为本地时间
+                            local_time = to_local_time(msg_time)
+                            reply_parts.append(
+                                f"{i}. 📧 标题：{subject}\n"
+                                f"   👤 发件人: {sender}\n"
+                                f"   📅 时间: {local_time}\n\n"
+                            )
+                        
+                        remaining = len(messages) - 10
+                        if remaining > 0:
+                            reply_parts.append(f"... 还有 {remaining} 封邮件未显示\n\n")
+                        
+                        reply_parts.append("💡 提示: 直接输入 查看正文 即可查看最新邮件内容")
+                        reply_text = "".join(reply_parts)
+                    else:
+                        reply_text = f"📭 暂无邮件\n\n该邮箱(ID: {email_id})\n目前没有收到任何邮件。"
+                    
+                    yield event.plain_result(reply_text)
+                else:
+                    logger.error(f"临时邮箱插件：获取邮件列表网络请求失败，状态码: {response.status}")
+                    yield event.plain_result(f"❌ 网络请求失败，状态码: {response.status}")
+                
+        except asyncio.TimeoutError:
+            logger.error("临时邮箱插件：获取邮件列表时请求超时")
+            yield event.plain_result("❌ 请求超时，请稍后重试")
+        except aiohttp.ClientError as e:
+            logger.error(f"临时邮箱插件：获取邮件列表时发生错误: {e}")
+            yield event.plain_result(f"❌ 获取邮件列表时发生错误: {e}")
+        except ValueError as e:
+            logger.error(f"临时邮箱插件：邮件列表API返回JSON格式无效: {e}")
+            yield event.plain_result("❌ 获取邮件列表失败，API响应格式错误。")
 
     @filter.command("查看正文")
     async def get_message_detail(self, event: AstrMessageEvent):
@@ -306,80 +533,65 @@ class TempEmailPlugin(Star):
             return
             
         user_origin = event.unified_msg_origin
-        user_lock = await self._get_user_lock(user_origin)
         
-        async with user_lock:
-            # 从消息中解析邮件ID参数
-            message_text = event.message_str.strip()
-            parts = message_text.split()
-            
-            message_id = None
-            if len(parts) >= 2:
-                # 如果用户提供了邮件ID，使用用户提供的ID
-                message_id = parts[1].strip()
+        # 从消息中解析邮件ID参数
+        message_text = event.message_str.strip()
+        # 只需要命令后的第一个参数，限制拆分次数
+        parts = message_text.split(None, 2)
+        
+        message_id = None
+        if len(parts) >= 2:
+            # 如果用户提供了邮件ID，使用用户提供的ID
+            message_id = parts[1].strip()
+        else:
+            # 如果用户没有提供邮件ID，自动使用最新的邮件ID
+            cached_ids = _lru_get(self.user_message_ids, user_origin)
+            if cached_ids:
+                message_id = cached_ids[0]  # 使用第一个（最新的）邮件ID
             else:
-                # 如果用户没有提供邮件ID，自动使用最新的邮件ID
-                if user_origin in self.user_message_ids and self.user_message_ids[user_origin]:
-                    message_id = self.user_message_ids[user_origin][0]  # 使用第一个（最新的）邮件ID
-                else:
-                    yield event.plain_result("❌ 未找到邮件ID，请先使用 邮箱列表 查看邮件，或手动指定邮件ID\n\n使用方法: 查看正文 <邮件ID>")
-                    return
+                yield event.plain_result("❌ 未找到邮件ID，请先使用 邮箱列表 查看邮件，或手动指定邮件ID\n\n使用方法: 查看正文 <邮件ID>")
+                return
+        
+        # 邮箱列表已在后台预取了最新邮件的详情
+        prefetched = await self._get_prefetched_detail(user_origin, message_id)
+        if prefetched:
+            yield event.plain_result(prefetched)
+            return
+        
+        try:
+            session = await self._get_session()
+            params = {
+                "apikey": self.api_key,
+                "id": message_id
+            }
             
-            try:
-                async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=65)) as session:
-                    headers = {
-                        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-                        "Accept": "application/json"
-                    }
+            async with session.get(self.MESSAGE_DETAIL_URL, params=params) as response:
+                if response.status == 200:
+                    data = _parse_json_object(await response.read())
+                    result = data.get("result", {})
                     
-                    params = {
-                        "apikey": self.api_key,
-                        "id": message_id
-                    }
-                    
-                    async with session.get(self.message_detail_url, params=params, headers=headers) as response:
-                        if response.status == 200:
-                            try:
-                                response_text = await response.text()
-                                
-                                data = json.loads(response_text)
-                                result = data.get("result", {})
-                                
-                                if result:
-                                    # 确保result是字典类型
-                                    if not isinstance(result, dict):
-                                        yield event.plain_result(f"❌ 邮件详情格式错误")
-                                        return
-                                    
-                                    sender = result.get("from", "未知发件人")
-                                    subject = result.get("subject", "无主题")
-                                    content = result.get("content", "无内容")
-                                    
-                                    cleaned_content = self._clean_email_content(content)
-                                    
-                                    reply_text = f"📧 邮件详情 (ID: {message_id})\n\n"
-                                    reply_text += f"📋 主题: {subject}\n"
-                                    reply_text += f"👤 发件人: {sender}\n"
-                                    reply_text += f"📄 内容:{cleaned_content}"
-                                    
-                                    if len(reply_text) > 2000:
-                                        reply_text = reply_text[:1900] + "\n... (内容过长，已截断)"
-                                    
-                                    yield event.plain_result(reply_text)
-                                else:
-                                    yield event.plain_result(f"❌ 获取邮件详情失败，请检查邮件ID: {message_id}")
-                                    
-                            except json.JSONDecodeError as e:
-                                logger.error(f"临时邮箱插件：邮件详情API返回JSON格式无效: {e}")
-                                yield event.plain_result("❌ 获取邮件详情失败，API响应格式错误。")
-                        else:
-                            response_text = await response.text()
-                            logger.error(f"临时邮箱插件：获取邮件详情网络请求失败，状态码: {response.status}")
-                            yield event.plain_result(f"❌ 网络请求失败，状态码: {response.status}")
+                    if result:
+                        # 确保result是字典类型
+                        if not isinstance(result, dict):
+                            yield event.plain_result(f"❌ 邮件详情格式错误")
+                            return
                         
-            except Exception as e:
-                logger.error(f"临时邮箱插件：获取邮件详情时发生错误: {e}")
-                yield event.plain_result(f"❌ 获取邮件详情时发生错误: {e}")
+                        yield event.plain_result(self._format_message_detail(message_id, result))
+                    else:
+                        yield event.plain_result(f"❌ 获取邮件详情失败，请检查邮件ID: {message_id}")
+                else:
+                    logger.error(f"临时邮箱插件：获取邮件详情网络请求失败，状态码: {response.status}")
+                    yield event.plain_result(f"❌ 网络请求失败，状态码: {response.status}")
+                
+        except asyncio.TimeoutError:
+            logger.error("临时邮箱插件：获取邮件详情时请求超时")
+            yield event.plain_result("❌ 请求超时，请稍后重试")
+        except aiohttp.ClientError as e:
+            logger.error(f"临时邮箱插件：获取邮件详情时发生错误: {e}")
+            yield event.plain_result(f"❌ 获取邮件详情时发生错误: {e}")
+        except ValueError as e:
+            logger.error(f"临时邮箱插件：邮件详情API返回JSON格式无效: {e}")
+            yield event.plain_result("❌ 获取邮件详情失败，API响应格式错误。")
 
     
 
@@ -422,6 +634,15 @@ class TempEmailPlugin(Star):
 
     async def terminate(self):
         """插件卸载时调用"""
-        self._save_user_data()  # 确保在退出时保存数据
+        for _, task, _ in self.user_detail_cache.values():
+            task.cancel()
+        self.user_detail_cache.clear()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self._dirty = False
+        await self._save_user_data()  # 确保在退出时保存数据
         self.user_email_ids.clear()
         self.user_message_ids.clear()
\ No newline at end of file